@@ -1,11 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import requests
-import json
+import numpy as np
+from datetime import datetime
 import os
+import re
 from streamlit_autorefresh import st_autorefresh
 
 # Page config
@@ -38,23 +36,115 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Auto-refresh every 30 seconds
-st_autorefresh(interval=30000, key="data_refresh")
+# Keep client-side redraws cheap on reruns
+PLOTLY_CONFIG = {"responsive": False, "displaylogo": False, "staticPlot": False}
+
+def data_files_version():
+    """Latest modification time of the data files; changes whenever either is rewritten"""
+    return max((os.stat(path).st_mtime_ns for path in ("sample_data.xlsx", "sample_data.parquet")
+                if os.path.exists(path)), default=0)
 
 @st.cache_data(ttl=60)
-def load_data():
-    """Load Excel data with caching"""
+def load_data(version):
+    """Load test data with caching, preferring the Parquet sidecar over Excel; version keys the cache"""
     try:
         if os.path.exists("sample_data.xlsx"):
-            df = pd.read_excel("sample_data.xlsx")
+            xlsx_mtime = os.stat("sample_data.xlsx").st_mtime
+            df = None
+            if os.path.exists("sample_data.parquet") and os.stat("sample_data.parquet").st_mtime >= xlsx_mtime:
+                try:
+                    df = pd.read_parquet("sample_data.parquet")
+                except Exception as e:
+                    st.warning(f"Could not read Parquet cache, using Excel: {e}")
+            if df is None:
+                df = stringify_mixed_columns(pd.read_excel("sample_data.xlsx"))
+                save_parquet(df)
         else:
             # Create sample data if file doesn't exist
             df = create_sample_data()
             df.to_excel("sample_data.xlsx", index=False)
-        return df
+            save_parquet(df)
+        return categorize(df)
     except Exception as e:
         st.error(f"Error loading data: {e}")
-        return create_sample_data()
+        return categorize(create_sample_data())
+
+def categorize(df):
+    """Store low-cardinality text columns as categoricals, which filter and count much faster"""
+    for col in ("Status", "Project", "Test_Type", "Failure_Type"):
+        # Excel yields the odd numeric value (e.g. project 707); Arrow needs one category type
+        df[col] = df[col].astype("string").astype("category")
+    return df
+
+@st.cache_data(ttl=60)
+def filter_options(df):
+    """Distinct values for the dashboard filter selectboxes"""
+    return {
+        col: sorted(df[col].dropna().unique().tolist())
+        for col in ("Status", "Project", "Test_Type")
+    }
+
+@st.cache_data(ttl=60)
+def summarize(df):
+    """Status and project counts shared by the Dashboard and Reports pages"""
+    status_counts = df['Status'].value_counts()
+    return {
+        "total": len(df),
+        "passed": int(status_counts.get('Pass', 0)),
+        "failed": int(status_counts.get('Fail', 0)),
+        "in_progress": int(status_counts.get('In Progress', 0)),
+        "by_project": df['Project'].value_counts(),
+        "by_status": status_counts,
+    }
+
+def counts_key(counts):
+    """Turn a value_counts Series into hashable (name, count) pairs for the chart caches"""
+    return tuple((str(name), int(count)) for name, count in counts.items())
+
+@st.cache_data(ttl=60)
+def status_pie(counts):
+    """Build the status pie chart from (status, count) pairs"""
+    import plotly.express as px  # deferred: only the chart pages need Plotly
+    return px.pie(values=[c for _, c in counts], names=[n for n, _ in counts],
+                  title="Test Status Breakdown").update_layout(uirevision="dashboard_v1")
+
+@st.cache_data(ttl=60)
+def project_bar(counts):
+    """Build the tests-per-project bar chart from (project, count) pairs"""
+    import plotly.express as px
+    return px.bar(x=[n for n, _ in counts], y=[c for _, c in counts],
+                  title="Project Test Distribution").update_layout(uirevision="dashboard_v1")
+
+@st.cache_data(ttl=60)
+def failure_by_project_bar(counts):
+    """Build the failures-per-project bar chart from (project, count) pairs"""
+    import plotly.express as px
+    return px.bar(x=[n for n, _ in counts], y=[c for _, c in counts],
+                  title="Failures by Project").update_layout(uirevision="dashboard_v1")
+
+def stringify_mixed_columns(df):
+    """Store text columns that also hold numbers (e.g. "7500 Cycles" next to 7500) as strings"""
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].dropna()
+        if values.map(type).nunique() > 1:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+def save_parquet(df):
+    """Write the Parquet sidecar used by load_data to skip Excel parsing"""
+    try:
+        # Arrow needs a single type per column
+        df = stringify_mixed_columns(df.copy())
+        df.to_parquet("sample_data.parquet", compression="zstd", index=False)
+        return True
+    except Exception as e:
+        st.warning(f"Could not write Parquet cache: {e}")
+        return False
+
+@st.cache_resource
+def excel_sync_state():
+    """Process-wide count of records saved to Parquet but not yet to the Excel workbook"""
+    return {"unsynced": 0}
 
 def create_sample_data():
     """Create sample data for demonstration"""
@@ -72,47 +162,58 @@ def create_sample_data():
     }
     return pd.DataFrame(data)
 
-def query_ai(prompt, data_context):
-    """Simple AI query function using local analysis"""
-    df = pd.read_excel("sample_data.xlsx") if os.path.exists("sample_data.xlsx") else create_sample_data()
-    
-    # Simple pattern matching for common queries
-    prompt_lower = prompt.lower()
-    
-    if "how many" in prompt_lower and "fail" in prompt_lower:
-        failed_count = len(df[df['Status'] == 'Fail'])
-        return f"There are {failed_count} failed tests in the database."
-    
-    elif "which project" in prompt_lower and "fail" in prompt_lower:
-        failed_tests = df[df['Status'] == 'Fail']
-        projects = failed_tests['Project'].value_counts()
-        result = "Failed tests by project:\n"
-        for project, count in projects.items():
-            result += f"• {project}: {count} failures\n"
-        return result
-    
-    elif "failure type" in prompt_lower:
-        failure_types = df[df['Failure_Type'] != '']['Failure_Type'].value_counts()
-        result = "Failure types:\n"
-        for failure_type, count in failure_types.items():
-            result += f"• {failure_type}: {count} occurrences\n"
-        return result
+def count_failures(df):
+    failed_count = int((df['Status'] == 'Fail').sum())
+    return f"There are {failed_count} failed tests in the database."
+
+def failures_by_project(df):
+    projects = df.loc[df['Status'] == 'Fail', 'Project'].value_counts().loc[lambda c: c > 0]
+    lines = [f"• {project}: {count} failures" for project, count in projects.items()]
+    return "Failed tests by project:\n" + "\n".join(lines)
+
+def failure_type_breakdown(df):
+    types = df['Failure_Type']
+    failure_types = types[types != ''].value_counts().loc[lambda c: c > 0]
+    lines = [f"• {failure_type}: {count} occurrences" for failure_type, count in failure_types.items()]
+    return "Failure types:\n" + "\n".join(lines)
+
+def endurance_summary(df):
+    endurance_tests = df[df['Test_Type'] == 'Endurance']
+    total = len(endurance_tests)
+    failed = len(endurance_tests[endurance_tests['Status'] == 'Fail'])
+    passed = len(endurance_tests[endurance_tests['Status'] == 'Pass'])
+    return f"Endurance Tests Summary:\n• Total: {total}\n• Passed: {passed}\n• Failed: {failed}\n• Success Rate: {(passed/total)*100:.1f}%"
+
+# Intent routing: a handler matches when every keyword prefixes some word of the prompt,
+# so "fail" also covers "failed" and "failures". First match wins.
+QUERY_INTENTS = {
+    ("how", "many", "fail"): count_failures,
+    ("which", "project", "fail"): failures_by_project,
+    ("failure", "type"): failure_type_breakdown,
+    ("endurance",): endurance_summary,
+}
+
+@st.cache_data(ttl=60)
+def query_ai(prompt, _data_context, data_version):
+    """Simple AI query function using local analysis, memoized per prompt and data version"""
+    tokens = set(re.findall(r"[a-z]+", prompt.lower()))
     
-    elif "endurance" in prompt_lower:
-        endurance_tests = df[df['Test_Type'] == 'Endurance']
-        total = len(endurance_tests)
-        failed = len(endurance_tests[endurance_tests['Status'] == 'Fail'])
-        passed = len(endurance_tests[endurance_tests['Status'] == 'Pass'])
-        return f"Endurance Tests Summary:\n• Total: {total}\n• Passed: {passed}\n• Failed: {failed}\n• Success Rate: {(passed/total)*100:.1f}%"
+    for keywords, handler in QUERY_INTENTS.items():
+        if all(any(token.startswith(keyword) for token in tokens) for keyword in keywords):
+            return handler(_data_context)
     
-    else:
-        return "I can help you analyze test data. Try asking:\n• 'How many tests failed?'\n• 'Which projects have failures?'\n• 'Show me failure types'\n• 'Analyze endurance tests'"
+    return "I can help you analyze test data. Try asking:\n• 'How many tests failed?'\n• 'Which projects have failures?'\n• 'Show me failure types'\n• 'Analyze endurance tests'"
 
 def main():
     st.markdown('<h1 class="main-header">🤖 AI-Powered Test Tracker</h1>', unsafe_allow_html=True)
     
-    # Load data
-    df = load_data()
+    # Reload when the data files change on disk; data entry stores its updated frame directly
+    version = data_files_version()
+    if st.session_state.get("data_version") != version:
+        st.session_state.df = load_data(version)
+        # Loading may write the sidecar, so re-stamp to avoid an immediate second load
+        st.session_state.data_version = data_files_version()
+    df = st.session_state.df
     
     # Sidebar navigation
     st.sidebar.title("📋 Navigation")
@@ -135,13 +236,17 @@ def main():
 def show_dashboard(df):
     st.header("📊 Test Dashboard")
     
+    # Auto-refresh every 30 seconds
+    st_autorefresh(interval=30000, key="refresh_dashboard")
+    
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
     
-    total_tests = len(df)
-    passed_tests = len(df[df['Status'] == 'Pass'])
-    failed_tests = len(df[df['Status'] == 'Fail'])
-    in_progress = len(df[df['Status'] == 'In Progress'])
+    summary = summarize(df)
+    total_tests = summary["total"]
+    passed_tests = summary["passed"]
+    failed_tests = summary["failed"]
+    in_progress = summary["in_progress"]
     
     with col1:
         st.markdown(f"""<div class="metric-card"><h3>Total Tests</h3><h2>{total_tests}</h2></div>""", unsafe_allow_html=True)
@@ -157,38 +262,37 @@ def show_dashboard(df):
     
     with col1:
         st.subheader("Status Distribution")
-        status_counts = df['Status'].value_counts()
-        fig = px.pie(values=status_counts.values, names=status_counts.index, 
-                    title="Test Status Breakdown")
-        st.plotly_chart(fig, use_container_width=True)
+        fig = status_pie(counts_key(summary["by_status"]))
+        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
     
     with col2:
         st.subheader("Tests by Project")
-        project_counts = df['Project'].value_counts()
-        fig = px.bar(x=project_counts.index, y=project_counts.values,
-                    title="Project Test Distribution")
-        st.plotly_chart(fig, use_container_width=True)
+        fig = project_bar(counts_key(summary["by_project"]))
+        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
     
     # Data table with filters
     st.subheader("Test Data")
     
     # Filters
+    options = filter_options(df)
     col1, col2, col3 = st.columns(3)
     with col1:
-        status_filter = st.selectbox("Filter by Status", ["All"] + list(df['Status'].unique()))
+        status_filter = st.selectbox("Filter by Status", ["All"] + options['Status'])
     with col2:
-        project_filter = st.selectbox("Filter by Project", ["All"] + list(df['Project'].unique()))
+        project_filter = st.selectbox("Filter by Project", ["All"] + options['Project'])
     with col3:
-        test_type_filter = st.selectbox("Filter by Test Type", ["All"] + list(df['Test_Type'].unique()))
+        test_type_filter = st.selectbox("Filter by Test Type", ["All"] + options['Test_Type'])
     
     # Apply filters
-    filtered_df = df.copy()
+    mask = np.ones(len(df), dtype=bool)
     if status_filter != "All":
-        filtered_df = filtered_df[filtered_df['Status'] == status_filter]
+        mask &= (df['Status'] == status_filter).to_numpy()
     if project_filter != "All":
-        filtered_df = filtered_df[filtered_df['Project'] == project_filter]
+        mask &= (df['Project'] == project_filter).to_numpy()
     if test_type_filter != "All":
-        filtered_df = filtered_df[filtered_df['Test_Type'] == test_type_filter]
+        mask &= (df['Test_Type'] == test_type_filter).to_numpy()
+    # The table is read-only, so show the cached frame itself when nothing is filtered out
+    filtered_df = df if mask.all() else df[mask]
     
     st.dataframe(filtered_df, use_container_width=True)
 
@@ -199,6 +303,11 @@ def show_ai_analysis(df):
     Ask questions about your test data in natural language. The AI will analyze your data and provide insights.
     """)
     
+    ai_query_fragment(df)
+
+@st.fragment
+def ai_query_fragment(df):
+    """Question buttons, input and answer; reruns on its own instead of the whole page"""
     # Sample questions
     st.subheader("Sample Questions You Can Ask:")
     sample_questions = [
@@ -220,7 +329,7 @@ def show_ai_analysis(df):
     if st.button("🔍 Analyze", type="primary"):
         if prompt:
             with st.spinner("Analyzing your data..."):
-                response = query_ai(prompt, df)
+                response = query_ai(prompt, df, st.session_state.data_version)
                 st.subheader("📊 Analysis Results")
                 st.write(response)
         else:
@@ -253,7 +362,7 @@ def show_data_entry(df):
             if test_id and project and title:
                 new_record = {
                     'Test_ID': test_id,
-                    'Date': date.strftime('%Y-%m-%d'),
+                    'Date': pd.Timestamp(date),
                     'Project': project,
                     'Title': title,
                     'Test_Type': test_type,
@@ -264,43 +373,60 @@ def show_data_entry(df):
                     'Cycles_Completed': cycles if cycles > 0 else ''
                 }
                 
-                # Add to dataframe and save
+                # Add to dataframe and save; Parquet is the primary store and the
+                # Excel workbook is only rewritten every few inserts across all sessions.
+                # Until then the newest records exist only in the sidecar: editing the
+                # xlsx by hand makes load_data rebuild the sidecar from it and drops them.
                 updated_df = pd.concat([df, pd.DataFrame([new_record])], ignore_index=True)
-                updated_df.to_excel("sample_data.xlsx", index=False)
+                sync = excel_sync_state()
+                sync["unsynced"] += 1
+                if sync["unsynced"] >= 10:
+                    updated_df.to_excel("sample_data.xlsx", index=False)
+                    sync["unsynced"] = 0
+                    # Written after the xlsx so load_data keeps reading the sidecar
+                    save_parquet(updated_df)
+                elif not save_parquet(updated_df):
+                    updated_df.to_excel("sample_data.xlsx", index=False)
+                    sync["unsynced"] = 0
+                st.session_state.df = categorize(stringify_mixed_columns(updated_df))
+                st.session_state.data_version = data_files_version()
                 st.success("✅ Test record added successfully!")
                 st.balloons()
-                st.experimental_rerun()
             else:
                 st.error("❌ Please fill in all required fields marked with *")
 
 def show_reports(df):
     st.header("📄 Test Reports")
     
+    # Auto-refresh every 30 seconds
+    st_autorefresh(interval=30000, key="refresh_reports")
+    
     # Summary Report
     st.subheader("📊 Summary Report")
     
+    summary = summarize(df)
+    
     col1, col2 = st.columns(2)
     
     with col1:
-        st.metric("Total Tests", len(df))
-        st.metric("Success Rate", f"{(len(df[df['Status'] == 'Pass']) / len(df) * 100):.1f}%")
+        st.metric("Total Tests", summary["total"])
+        st.metric("Success Rate", f"{(summary['passed'] / summary['total'] * 100):.1f}%")
     
     with col2:
-        st.metric("Failed Tests", len(df[df['Status'] == 'Fail']))
-        st.metric("Tests in Progress", len(df[df['Status'] == 'In Progress']))
+        st.metric("Failed Tests", summary["failed"])
+        st.metric("Tests in Progress", summary["in_progress"])
     
     # Failure Analysis
-    if len(df[df['Status'] == 'Fail']) > 0:
+    if summary["failed"] > 0:
         st.subheader("🔍 Failure Analysis")
-        failed_df = df[df['Status'] == 'Fail']
+        failed_mask = df['Status'] == 'Fail'
         
-        failure_by_project = failed_df['Project'].value_counts()
-        fig = px.bar(x=failure_by_project.index, y=failure_by_project.values,
-                    title="Failures by Project")
-        st.plotly_chart(fig, use_container_width=True)
+        failure_by_project = df.loc[failed_mask, 'Project'].value_counts().loc[lambda c: c > 0]
+        fig = failure_by_project_bar(counts_key(failure_by_project))
+        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
         st.subheader("Failed Tests Details")
-        st.dataframe(failed_df[['Test_ID', 'Project', 'Title', 'Failure_Type', 'Failure_Description']], 
+        st.dataframe(df.loc[failed_mask, ['Test_ID', 'Project', 'Title', 'Failure_Type', 'Failure_Description']], 
                     use_container_width=True)
     
     # Download options